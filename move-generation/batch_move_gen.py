@@ -1,7 +1,8 @@
 import json
+import orjson
 from move_generation import PyBoard
 
-def load_positions(filename):
+def load_positions(filename, stream=False):
     """Load chess positions from a JSON dataset file.
     Expected format:
     [
@@ -11,28 +12,89 @@ def load_positions(filename):
         },
         ...
     ]
+    The file is parsed in one go with orjson. With stream=True a generator
+    is returned instead, yielding positions one at a time via ijson, so
+    datasets too large for memory never have to be held as a whole.
     """
-    with open(filename) as f:
-        return json.load(f)
+    if stream:
+        return _stream_positions(filename)
+    with open(filename, "rb") as f:
+        return orjson.loads(f.read())
+
+def _stream_positions(filename):
+    # Only needed for streaming, so ijson stays an optional dependency
+    import ijson
+
+    with open(filename, "rb") as f:
+        yield from ijson.items(f, "item")
+
+PIECE_SYMBOLS = {
+    "pawn": "p",
+    "knight": "n",
+    "bishop": "b",
+    "rook": "r",
+    "queen": "q",
+    "king": "k",
+}
+
+# (FEN flag, color, king square, rook square) for each castling right
+CASTLING_HOMES = [
+    ("K", "white", 4, 7),
+    ("Q", "white", 4, 0),
+    ("k", "black", 60, 63),
+    ("q", "black", 60, 56),
+]
+
+def pieces_dict_to_fen(pos):
+    """Convert a position dict (see `load_positions`) into a FEN string.
+    Castling rights are not part of the dataset format; a right is granted
+    whenever the king and the matching rook stand on their home squares
+    ("-" if none apply). En passant is always written as "-".
+    """
+    squares = [None] * 64
+    occupancy = {}
+    for piece_type, color, square in pos["pieces"]:
+        symbol = PIECE_SYMBOLS[piece_type]
+        squares[square] = symbol.upper() if color == "white" else symbol
+        occupancy[square] = (piece_type, color)
+
+    ranks = []
+    for rank in range(7, -1, -1):
+        row = ""
+        empty = 0
+        for symbol in squares[rank * 8:rank * 8 + 8]:
+            if symbol is None:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += symbol
+        if empty:
+            row += str(empty)
+        ranks.append(row)
+
+    castling = "".join(
+        flag for flag, color, king_sq, rook_sq in CASTLING_HOMES
+        if occupancy.get(king_sq) == ("king", color)
+        and occupancy.get(rook_sq) == ("rook", color)
+    ) or "-"
+
+    side = "w" if pos["side_to_move"] == "white" else "b"
+    return f"{'/'.join(ranks)} {side} {castling} - 0 1"
 
 def batch_generate_moves(positions):
-    """Generate moves for multiple positions efficiently."""
+    """Generate moves for multiple positions efficiently.
+    Accepts any iterable of positions and yields one move list per position.
+    """
     board = PyBoard()
-    results = []
     
     for pos in positions:
-        # Convert pieces to tuples (Rust expects tuples, not lists)
-        pieces = [tuple(piece) for piece in pos["pieces"]]
-        
-        # Set up the position
-        board.set_pieces(pieces)
-        board.set_side_to_move(pos["side_to_move"])
+        # One FEN load replaces the set_pieces/set_side_to_move round-trip
+        board.load_fen(pieces_dict_to_fen(pos))
         
         # Generate moves for this position
-        moves = board.generate_moves()
-        results.append(moves)
-    
-    return results
+        yield board.generate_moves()
 
 # Example usage
 if __name__ == "__main__":
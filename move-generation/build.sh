@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+# Build and install the extension tuned for the local CPU (BMI2/PEXT,
+# POPCNT, ...). The resulting binary is not portable to older CPUs; use a
+# plain `maturin build --release` for distributable wheels.
+set -euo pipefail
+cd "$(dirname "$0")"
+export RUSTFLAGS="${RUSTFLAGS:-} -C target-cpu=native"
+maturin develop --release "$@"
@@ -8,10 +8,12 @@ Modes:
   - heavy  : very large workloads (for long-running cluster jobs)
 
 What it does:
-  - spawns N worker processes
-  - each worker repeatedly generates random playout positions (using python-chess)
-    and loads the FEN into the Rust-backed `PyBoard` then calls `generate_moves`
-    to measure move-generation throughput.
+  - starts a pool of N worker processes (or threads, with --parallel-kind thread),
+    each holding one Rust-backed `PyBoard`
+  - positions are handed out to the pool in chunks; for each one a worker
+    generates a random playout position (using python-chess), loads the FEN
+    into its `PyBoard` and calls `generate_moves` to measure move-generation
+    throughput.
   - collects timings, memory and cpu usage and prints a detailed report.
 
 Usage examples:
@@ -24,11 +26,15 @@ Notes:
 """
 
 import argparse
+import itertools
 import time
 import os
-import statistics
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing.util
+import threading
+from multiprocessing.pool import ThreadPool
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
 import psutil
 import random
 from typing import Dict, Any, Tuple, List
@@ -38,63 +44,173 @@ from move_generation import PyBoard
 import chess
 
 
-def worker_loop(worker_id: int, positions: int, depth: int, seed: int) -> Dict[str, Any]:
-    random.seed(seed)
-    py_board = PyBoard()
-    stats = {
+# Position times are summarized in a log-linear histogram: values below
+# 2 * _HIST_SUB ns are exact, above that every power of two is split into
+# _HIST_SUB buckets (relative error <= 1/_HIST_SUB). Histograms from
+# different workers merge by addition, so memory stays constant no matter
+# how many positions are measured.
+_HIST_SUB_BITS = 5
+_HIST_SUB = 1 << _HIST_SUB_BITS
+_HIST_BUCKETS = 64 * _HIST_SUB
+
+
+def _hist_bucket(ns: int) -> int:
+    shift = ns.bit_length() - _HIST_SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return (shift << _HIST_SUB_BITS) + (ns >> shift)
+
+
+def _hist_quantile(hist: np.ndarray, q: float) -> float:
+    """Approximate `q`-quantile (0..1) of a timing histogram, in ns."""
+    cum = np.cumsum(hist)
+    idx = int(np.searchsorted(cum, max(1.0, q * cum[-1])))
+    if idx < 2 * _HIST_SUB:
+        return float(idx)
+    shift = (idx >> _HIST_SUB_BITS) - 1
+    low = (idx - (shift << _HIST_SUB_BITS)) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+# Each worker owns one int64 row of a stats block and updates it in place.
+# Process workers share the block through shared memory, so nothing but task
+# ids crosses the process pipes.
+_ROW_POSITIONS, _ROW_MOVES, _ROW_TIME_SUM, _ROW_TIME_MIN, _ROW_TIME_MAX, _ROW_START, _ROW_END = range(7)
+_ROW_HIST = 7
+_ROW_SIZE = _ROW_HIST + _HIST_BUCKETS
+
+
+def _new_stats_rows(workers: int, buffer: Any = None) -> np.ndarray:
+    rows = np.ndarray((workers, _ROW_SIZE), dtype=np.int64, buffer=buffer)
+    rows[:] = 0
+    rows[:, _ROW_TIME_MIN] = np.iinfo(np.int64).max
+    return rows
+
+
+def _row_to_stats(worker_id: int, row: np.ndarray) -> Dict[str, Any]:
+    return {
         'worker_id': worker_id,
-        'positions': 0,
-        'moves_generated': 0,
-        'position_times': [],
-        'start_time': time.time(),
+        'positions': int(row[_ROW_POSITIONS]),
+        'moves_generated': int(row[_ROW_MOVES]),
+        'time_sum_ns': int(row[_ROW_TIME_SUM]),
+        'time_min_ns': int(row[_ROW_TIME_MIN]),
+        'time_max_ns': int(row[_ROW_TIME_MAX]),
+        'time_hist': row[_ROW_HIST:].copy(),
+        'start_time': row[_ROW_START] * 1e-9,
+        'end_time': row[_ROW_END] * 1e-9,
     }
 
+
+# Per-worker state, created once by the pool initializer. Thread-local so
+# that thread-pool workers each get their own board and RNG.
+_worker = threading.local()
+
+
+def _init_process_worker(depth: int, seed: int, shm_name: str, workers: int, next_row: Any) -> None:
+    with next_row.get_lock():
+        row = next_row.value
+        next_row.value += 1
+    if row >= workers:
+        # Only happens when the pool restarts a worker that died
+        raise RuntimeError(f"no stats row left for restarted worker (row {row}, {workers} workers)")
+    _worker.shm = SharedMemory(name=shm_name)
+    stats = np.ndarray((workers, _ROW_SIZE), dtype=np.int64, buffer=_worker.shm.buf)[row]
+    _init_worker_state(stats, depth, seed)
+    # Pool workers run registered finalizers when they exit normally
+    multiprocessing.util.Finalize(None, _close_process_worker, exitpriority=0)
+
+
+def _close_process_worker() -> None:
+    # The view must go before the mapping it borrows from can be closed
+    del _worker.stats
+    _worker.shm.close()
+
+
+def _init_thread_worker(depth: int, seed: int, rows: np.ndarray, next_row: Any) -> None:
+    _init_worker_state(rows[next(next_row)], depth, seed)
+
+
+def _init_worker_state(stats: np.ndarray, depth: int, seed: int) -> None:
+    _worker.stats = stats
+    _worker.board = PyBoard()
+    _worker.rng = random.Random()
+    _worker.depth = depth
+    _worker.seed = seed
+    # Wall clock (comparable across processes); excludes pool startup
+    stats[_ROW_START] = time.time_ns()
+
+
+def process_one(position_id: int) -> None:
+    """Generate one random playout position and time move generation on it.
+
+    Results are accumulated into this worker's shared stats row.
+    """
+    # Seed per position so results do not depend on how work is scheduled
+    rng = _worker.rng
+    rng.seed((_worker.seed << 32) + position_id)
+    py_board = _worker.board
+
     # We'll create random playouts using python-chess for diversity
-    for i in range(positions):
-        # Generate a random playout up to `depth` moves from start
-        b = chess.Board()
-        moves_made = 0
-        while moves_made < depth and not b.is_game_over():
-            legal = list(b.legal_moves)
-            if not legal:
-                break
-            mv = random.choice(legal)
-            b.push(mv)
-            moves_made += 1
-
-        fen = b.fen()
-        t0 = time.time()
-        py_board.load_fen(fen)
-        moves = py_board.generate_moves()  # list of UCI strings
-        t1 = time.time()
-        elapsed = t1 - t0
-
-        stats['positions'] += 1
-        stats['moves_generated'] += len(moves)
-        stats['position_times'].append(elapsed)
-
-        # Lightweight backpressure to avoid locking the system fully in very heavy tests
-        if i % 1000 == 0:
-            time.sleep(0)
-
-    stats['end_time'] = time.time()
-    return stats
+    b = chess.Board()
+    moves_made = 0
+    # No is_game_over() check: it walks the move stack for repetitions every
+    # ply. Playouts stop only on depth or when there are no legal moves.
+    while moves_made < _worker.depth:
+        legal = list(b.legal_moves)
+        if not legal:
+            break
+        mv = rng.choice(legal)
+        b.push(mv)
+        moves_made += 1
+
+    fen = b.fen()
+    t0 = time.perf_counter_ns()
+    py_board.load_fen(fen)
+    moves = py_board.generate_moves()  # list of UCI strings
+    elapsed_ns = time.perf_counter_ns() - t0
+
+    stats = _worker.stats
+    stats[_ROW_POSITIONS] += 1
+    stats[_ROW_MOVES] += len(moves)
+    stats[_ROW_TIME_SUM] += elapsed_ns
+    if elapsed_ns < stats[_ROW_TIME_MIN]:
+        stats[_ROW_TIME_MIN] = elapsed_ns
+    if elapsed_ns > stats[_ROW_TIME_MAX]:
+        stats[_ROW_TIME_MAX] = elapsed_ns
+    stats[_ROW_HIST + _hist_bucket(elapsed_ns)] += 1
+    stats[_ROW_END] = time.time_ns()
+
+
+def process_range(bounds: Tuple[int, int]) -> None:
+    """Run `process_one` for every position id in [start, stop)."""
+    for position_id in range(*bounds):
+        process_one(position_id)
 
 
 def aggregate_results(worker_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-    total_positions = sum(w['positions'] for w in worker_results)
-    total_moves = sum(w['moves_generated'] for w in worker_results)
-    all_times = [t for w in worker_results for t in w['position_times']]
+    measured = [w for w in worker_results if w['positions']]
+    total_positions = sum(w['positions'] for w in measured)
+    total_moves = sum(w['moves_generated'] for w in measured)
+    time_sum = sum(w['time_sum_ns'] for w in measured) * 1e-9
+
+    median = p95 = 0.0
+    if measured:
+        hist = np.sum([w['time_hist'] for w in measured], axis=0)
+        time_min = min(w['time_min_ns'] for w in measured)
+        time_max = max(w['time_max_ns'] for w in measured)
+        # Bucket midpoints can fall outside the observed range
+        median = min(max(_hist_quantile(hist, 0.5), time_min), time_max) * 1e-9
+        p95 = min(max(_hist_quantile(hist, 0.95), time_min), time_max) * 1e-9
 
     aggregated = {
         'total_positions': total_positions,
         'total_moves': total_moves,
         'avg_moves_per_position': total_moves / total_positions if total_positions else 0,
-        'total_time': max((w['end_time'] for w in worker_results)) - min((w['start_time'] for w in worker_results)),
-        'mean_time_per_position': statistics.mean(all_times) if all_times else 0,
-        'median_time_per_position': statistics.median(all_times) if all_times else 0,
-        'p95_time_per_position': statistics.quantiles(all_times, n=100)[94] if len(all_times) >= 100 else max(all_times) if all_times else 0,
-        'moves_per_second': (total_moves / sum(all_times)) if sum(all_times) > 0 else 0,
+        'total_time': max((w['end_time'] for w in measured), default=0) - min((w['start_time'] for w in measured), default=0),
+        'mean_time_per_position': time_sum / total_positions if total_positions else 0,
+        'median_time_per_position': median,
+        'p95_time_per_position': p95,
+        'moves_per_second': (total_moves / time_sum) if time_sum > 0 else 0,
     }
     return aggregated
 
@@ -114,23 +230,62 @@ def run(mode: str, workers: int, positions: int, depth: int, seed: int, parallel
     start = time.time()
     sys_start_mem = psutil.Process(os.getpid()).memory_info().rss / (1024*1024)
 
-    worker_args = []
-    for wid in range(workers):
-        worker_args.append((wid, positions, depth, seed + wid))
+    total_positions = workers * positions
+    chunksize = max(1, total_positions // workers // 8)
 
-    results = []
-    # Run workers in separate processes to get real parallelism
-    with ProcessPoolExecutor(max_workers=workers) as ex:
-        futures = [ex.submit(worker_loop, *args) for args in worker_args]
-        for f in as_completed(futures):
+    # One stats row per worker, written in place by the workers. Process
+    # workers give real parallelism for the python-chess playouts; thread
+    # workers skip process startup but share the GIL. Either pool keeps one
+    # PyBoard per worker and hands out positions dynamically.
+    shm = None
+    next_row = None
+    if parallel_kind == 'process':
+        shm = SharedMemory(create=True, size=workers * _ROW_SIZE * 8)
+        rows = _new_stats_rows(workers, shm.buf)
+    else:
+        rows = _new_stats_rows(workers)
+
+    try:
+        if shm is not None:
+            next_row = multiprocessing.Value('i', 0)
+            pool = multiprocessing.Pool(processes=workers, initializer=_init_process_worker,
+                                        initargs=(depth, seed, shm.name, workers, next_row))
+        else:
+            pool = ThreadPool(processes=workers, initializer=_init_thread_worker,
+                              initargs=(depth, seed, rows, itertools.count()))
+
+        with pool:
             try:
-                res = f.result()
-                results.append(res)
-                # lightweight per-worker progress
-                print(f"Worker {res['worker_id']} done: positions={res['positions']} moves={res['moves_generated']} avg_pos_time={(sum(res['position_times'])/len(res['position_times'])) if res['position_times'] else 0:.6f}s")
+                # Positions go out as explicit id ranges: unlike chunksize > 1,
+                # the resulting iterator supports next(timeout)
+                chunks = ((i, min(i + chunksize, total_positions)) for i in range(0, total_positions, chunksize))
+                pending = pool.imap_unordered(process_range, chunks)
+                while True:
+                    try:
+                        pending.next(timeout=1.0)
+                    except StopIteration:
+                        break
+                    except multiprocessing.TimeoutError:
+                        # A worker that died is restarted with no stats row and
+                        # fails in its initializer; the pool would retry forever
+                        if next_row is not None and next_row.value > workers:
+                            raise RuntimeError("a pool worker died and was restarted")
+                pool.close()
+                pool.join()
             except Exception as e:
                 print(f"Worker failed: {e}")
 
+        results = [_row_to_stats(wid, row) for wid, row in enumerate(rows) if row[_ROW_POSITIONS]]
+    finally:
+        if shm is not None:
+            del rows  # release the buffer export before closing
+            shm.close()
+            shm.unlink()
+
+    for res in results:
+        # lightweight per-worker progress
+        print(f"Worker {res['worker_id']} done: positions={res['positions']} moves={res['moves_generated']} avg_pos_time={res['time_sum_ns'] * 1e-9 / res['positions']:.6f}s")
+
     aggregated = aggregate_results(results)
     end = time.time()
     sys_end_mem = psutil.Process(os.getpid()).memory_info().rss / (1024*1024)
@@ -40,7 +40,7 @@ def stress_test(num_moves=70, num_games=10):
     start_time = time.time()
     total_positions = 0
     total_moves = 0
-    move_times = []
+    move_time_ns = 0
     
     try:
         # Load and process all positions using our native parser
@@ -49,15 +49,14 @@ def stress_test(num_moves=70, num_games=10):
         
         for fen, moves_str in positions:
             # Load position
-            t0 = time.time()
+            t0 = time.perf_counter_ns()
             board.load_fen(fen)
             moves = board.generate_moves()
-            t1 = time.time()
-            move_times.append(t1 - t0)
+            move_time_ns += time.perf_counter_ns() - t0
             total_moves += len(moves)
             
         total_time = time.time() - start_time
-        avg_gen_time = sum(move_times) / len(move_times) if move_times else 0
+        avg_gen_time = move_time_ns * 1e-9 / total_positions if total_positions else 0
         
         print(f"\nStress Test Results:")
         print(f"Total positions processed: {total_positions}")
@@ -70,15 +69,21 @@ def stress_test(num_moves=70, num_games=10):
         print("\nValidating random moves against python-chess...")
         validation_count = min(10, total_positions)
         validated = 0
-        
-        for i, (fen, _) in enumerate(random.sample(positions, validation_count)):
-            board.load_fen(fen)
-            rust_moves = set(board.generate_moves())
+        fens = [fen for fen, _ in random.sample(positions, validation_count)]
+
+        # Generate all Rust move sets first, reusing the same board
+        load_fen = board.load_fen
+        generate_moves = board.generate_moves
+        rust_sets = []
+        for fen in fens:
+            load_fen(fen)
+            rust_sets.append(frozenset(generate_moves()))
 
-            # Validate against python-chess
-            py_board = chess.Board(fen)
-            py_moves = {move.uci() for move in py_board.legal_moves}
+        # Validate against python-chess
+        uci = chess.Move.uci
+        py_sets = [frozenset(uci(move) for move in chess.Board(fen).legal_moves) for fen in fens]
 
+        for i, (fen, rust_moves, py_moves) in enumerate(zip(fens, rust_sets, py_sets)):
             if i == 0:
                 print("\n--- DEBUG: First validation position ---")
                 print("FEN:", fen)